@@ -6,17 +6,19 @@ User records stored in Cloud Firestore.
 
 import os
 import json
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
 import firebase_admin
+from cachetools import TLRUCache, TTLCache, cached
 from firebase_admin import credentials, auth as firebase_auth, firestore
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 
-from .database import get_db
+from .database import get_db, get_async_db
 
 # Initialize Firebase Admin SDK
 # Priority: 1) FIREBASE_SERVICE_ACCOUNT_JSON env var (inline JSON, for Cloud Run)
@@ -41,6 +43,19 @@ if not firebase_admin._apps:
 # Security
 security = HTTPBearer(auto_error=False)
 
+# Verified ID token claims, each cached until the token's own `exp` time
+_token_cache = TLRUCache(
+    maxsize=10_000,
+    ttu=lambda _token, claims, _now: claims["exp"],
+    timer=time.time,
+)
+
+# Firestore user records, cached briefly so polling clients skip a round-trip
+_user_cache = TTLCache(maxsize=10_000, ttl=30)
+
+# Leaderboard results keyed by limit; cleared whenever a user's stats change
+_leaderboard_cache = TTLCache(maxsize=16, ttl=10)
+
 
 # Pydantic models
 class UserResponse(BaseModel):
@@ -62,22 +77,39 @@ class LeaderboardEntry(BaseModel):
 
 
 def verify_firebase_token(token: str) -> dict:
-    """Verify a Firebase ID token and return the decoded claims."""
+    """
+    Verify a Firebase ID token and return the decoded claims.
+
+    Claims are cached until the token expires, so repeat requests with the
+    same token skip the RSA signature check.
+    """
+    claims = _token_cache.get(token)
+    if claims is not None:
+        return claims
+
     try:
-        return firebase_auth.verify_id_token(token)
+        claims = firebase_auth.verify_id_token(token)
     except Exception:
         return None
 
+    _token_cache[token] = claims
+    return claims
+
 
-def get_or_create_user(uid: str, email: str, username: str) -> dict:
+async def get_or_create_user(uid: str, email: str, username: str) -> dict:
     """Look up a user by Firebase UID, creating a new record if needed."""
-    db = get_db()
+    cached = _user_cache.get(uid)
+    if cached is not None:
+        return cached
+
+    db = get_async_db()
     user_ref = db.collection("users").document(uid)
-    user_doc = user_ref.get()
+    user_doc = await user_ref.get()
 
     if user_doc.exists:
         data = user_doc.to_dict()
         data["id"] = uid
+        _user_cache[uid] = data
         return data
 
     # Create new user document
@@ -89,12 +121,19 @@ def get_or_create_user(uid: str, email: str, username: str) -> dict:
         "arts_spotted": 0,
         "verified_spots": 0,
     }
-    user_ref.set(user_data)
+    await user_ref.set(user_data)
 
     user_data["id"] = uid
+    _user_cache[uid] = user_data
     return user_data
 
 
+def invalidate_user_stats(uid: str) -> None:
+    """Drop cached data derived from a user's stats after they change."""
+    _user_cache.pop(uid, None)
+    _leaderboard_cache.clear()
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
@@ -118,7 +157,7 @@ async def get_current_user(
     email = decoded.get("email", "")
     username = decoded.get("name", email.split("@")[0] if email else uid[:8])
 
-    return get_or_create_user(uid, email, username)
+    return await get_or_create_user(uid, email, username)
 
 
 async def get_optional_user(
@@ -136,22 +175,27 @@ async def get_optional_user(
     email = decoded.get("email", "")
     username = decoded.get("name", email.split("@")[0] if email else uid[:8])
 
-    return get_or_create_user(uid, email, username)
+    return await get_or_create_user(uid, email, username)
 
 
+@cached(_leaderboard_cache)
 def get_leaderboard(limit: int = 10) -> list[LeaderboardEntry]:
     """Get the top users by arts_spotted."""
     db = get_db()
     users_ref = db.collection("users")
-    query = users_ref.order_by("arts_spotted", direction=firestore.Query.DESCENDING).limit(limit)
-    docs = query.stream()
-
-    return [
-        LeaderboardEntry(
+    query = (
+        users_ref.select(["username", "arts_spotted", "verified_spots"])
+        .order_by("arts_spotted", direction=firestore.Query.DESCENDING)
+        .limit(limit)
+    )
+
+    entries = []
+    for i, doc in enumerate(query.stream()):
+        data = doc.to_dict()
+        entries.append(LeaderboardEntry(
             rank=i + 1,
-            username=doc.to_dict().get("username", "Unknown"),
-            arts_spotted=doc.to_dict().get("arts_spotted", 0),
-            verified_spots=doc.to_dict().get("verified_spots", 0),
-        )
-        for i, doc in enumerate(docs)
-    ]
+            username=data.get("username", "Unknown"),
+            arts_spotted=data.get("arts_spotted", 0),
+            verified_spots=data.get("verified_spots", 0),
+        ))
+    return entries
@@ -5,12 +5,15 @@ This service uses OpenAI's CLIP model to compare uploaded images
 against a reference database of Anna Laurini's artwork.
 """
 
+import io
 import os
+import hashlib
 from pathlib import Path
 from typing import Optional
 import numpy as np
 from PIL import Image
 import torch
+import torch.nn.functional as F
 from transformers import CLIPProcessor, CLIPModel
 
 # Register HEIC/HEIF support with Pillow
@@ -23,12 +26,120 @@ except ImportError:
     HEIC_SUPPORTED = False
     print("⚠️ HEIC/HEIF support not available (install pillow-heif)")
 
+# Optional FAISS int8 inner-product index for large reference sets on CPU
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+# Optional libvips decoder for JPEG/PNG/WebP (SIMD colour conversion, shrink-on-load)
+try:
+    import pyvips
+    # Uploads are untrusted: disable loaders (SVG, MAT, CSV, vips, ...) that aren't
+    # fuzzed for hostile input
+    pyvips.block_untrusted_set(True)
+    PYVIPS_AVAILABLE = True
+    print("✅ libvips image decoding enabled")
+except (ImportError, OSError):
+    PYVIPS_AVAILABLE = False
+
+# Images accepted by the verification methods: PIL Images or (H, W, 3) uint8 arrays
+ImageLike = Image.Image | np.ndarray
+
+# libvips loaders allowed for uploads; anything else goes to Pillow
+VIPS_LOADERS = {"jpegload_buffer", "pngload_buffer", "webpload_buffer"}
+
+# ISO BMFF `ftyp` brands of HEVC-coded HEIF images. The pyvips binary wheel's
+# libheif has no HEVC decoder, so these go straight to pillow-heif
+HEIF_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"hevm", b"hevs", b"mif1", b"msf1"}
+
+
+def _is_heif(data: bytes) -> bool:
+    """Check the ISO BMFF header for a HEIC/HEIF major brand."""
+    return data[4:8] == b"ftyp" and data[8:12] in HEIF_BRANDS
+
+
+def _decode_with_vips(data: bytes, shortest_edge: Optional[int] = None) -> np.ndarray:
+    """Decode image bytes with libvips into an (H, W, 3) uint8 sRGB array."""
+    # Only the header is read here; pixels are decoded on demand
+    image = pyvips.Image.new_from_buffer(data, "", access="sequential")
+    # libvips sniffs the format from the bytes, regardless of the checked MIME type
+    loader = image.get("vips-loader")
+    if loader not in VIPS_LOADERS:
+        raise ValueError(f"Unsupported libvips loader: {loader}")
+    if shortest_edge is not None and min(image.width, image.height) > shortest_edge:
+        # Shrink-on-load: libjpeg/libwebp decode at a reduced scale, then one resize
+        # brings the shortest edge to exactly shortest_edge (size="down" never upscales)
+        if image.width <= image.height:
+            box = (shortest_edge, image.height)
+        else:
+            box = (image.width, shortest_edge)
+        image = pyvips.Image.thumbnail_buffer(data, box[0], height=box[1], size="down", no_rotate=True)
+    image = image.colourspace("srgb")
+    if image.bands > 3:
+        # Drop alpha, matching Pillow's convert("RGB")
+        image = image.extract_band(0, n=3)
+    if image.format != "uchar":
+        image = image.cast("uchar")
+    return np.ndarray(
+        buffer=image.write_to_memory(),
+        dtype=np.uint8,
+        shape=(image.height, image.width, 3),
+    )
+
+
+def decode_image(data: bytes, shortest_edge: Optional[int] = None) -> np.ndarray:
+    """
+    Decode uploaded image bytes into an (H, W, 3) uint8 RGB array.
+    
+    Uses libvips when available, which avoids Pillow's per-tile overhead and
+    can shrink JPEGs while decoding. HEIC/HEIF is decoded by Pillow with
+    pillow-heif, as is anything when libvips is missing or rejects the input.
+    
+    Args:
+        data: Encoded image bytes
+        shortest_edge: If given, larger images are downscaled while decoding so
+            their shortest edge is exactly this size (libvips only)
+    """
+    if PYVIPS_AVAILABLE and not _is_heif(data):
+        try:
+            return _decode_with_vips(data, shortest_edge)
+        except Exception:
+            # Any libvips/cffi failure falls back to Pillow rather than failing the upload
+            pass
+    return np.asarray(Image.open(io.BytesIO(data)).convert("RGB"))
+
+
+class _ImageEncoder(torch.nn.Module):
+    """CLIP vision tower + projection, equivalent to `CLIPModel.get_image_features`."""
+    
+    def __init__(self, model: CLIPModel):
+        super().__init__()
+        self.vision_model = model.vision_model
+        self.visual_projection = model.visual_projection
+    
+    def forward(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        pooled_output = self.vision_model(pixel_values=pixel_values)[1]
+        return self.visual_projection(pooled_output)
+
 
 class CLIPService:
     """Service for verifying artwork using CLIP embeddings."""
     
     MODEL_NAME = "openai/clip-vit-base-patch32"
     SUPPORTED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".heic", ".heif"}
+    # Number of reference images embedded per forward pass
+    BATCH_SIZE = 32
+    # Embeddings cache file, stored alongside the reference images
+    CACHE_FILENAME = ".embeddings_cache.pt"
+    # Bump when preprocessing changes so cached embeddings are recomputed
+    CACHE_VERSION = 3
+    # Piecewise-linear knots mapping raw similarity to confidence (see _scale_similarity)
+    SIMILARITY_KNOTS = np.array([0.0, 0.40, 0.55, 0.70, 0.80, 1.00])
+    CONFIDENCE_KNOTS = np.array([0.0, 25.0, 50.0, 75.0, 90.0, 100.0])
+    # Below this many references a single matmul is faster than a FAISS search
+    FAISS_MIN_REFERENCES = 1000
     
     def __init__(self, reference_dir: str = "reference_art"):
         """
@@ -38,6 +149,8 @@ class CLIPService:
             reference_dir: Path to directory containing reference artwork images
         """
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Mixed precision for batched inference: FP16 on GPU, BF16 on CPU
+        self.dtype = torch.float16 if self.device == "cuda" else torch.bfloat16
         print(f"🔧 Using device: {self.device}")
         
         # Load CLIP model and processor
@@ -47,90 +160,257 @@ class CLIPService:
         self.model.eval()
         print(f"✅ CLIP model loaded successfully (type: {type(self.model).__name__})")
         
-        # Store reference embeddings
+        # Preprocessing constants, applied with tensor ops instead of the processor
+        image_processor = self.processor.image_processor
+        self.resize_size = image_processor.size["shortest_edge"]
+        self.crop_size = (image_processor.crop_size["height"], image_processor.crop_size["width"])
+        self.pixel_mean = torch.tensor(image_processor.image_mean, device=self.device).view(1, 3, 1, 1)
+        self.pixel_std = torch.tensor(image_processor.image_std, device=self.device).view(1, 3, 1, 1)
+        
+        # Eager encoder for batches, traced encoder for single-image requests
+        self.image_encoder = _ImageEncoder(self.model).eval()
+        self.traced_encoder = self._trace_image_encoder()
+        
+        # Store reference embeddings as a pre-transposed (512, N) matrix in self.dtype
         self.reference_embeddings: Optional[torch.Tensor] = None
         self.reference_names: list[str] = []
+        self.faiss_index = None
         
         # Load reference images
         self.reference_dir = Path(reference_dir)
         self._load_reference_images()
     
+    def _trace_image_encoder(self) -> torch.nn.Module:
+        """
+        Trace the image encoder for a single fixed-size input and warm it up.
+        
+        Per-request inference always sees one 224x224 image, so a traced graph
+        skips the HuggingFace Python wrapper on the hot path. Falls back to the
+        eager encoder if tracing fails.
+        """
+        dummy = torch.zeros(1, 3, *self.crop_size, device=self.device)
+        try:
+            with torch.no_grad():
+                traced = torch.jit.trace(self.image_encoder, dummy, strict=False)
+                # Warm up so the first real request doesn't pay optimization cost
+                for _ in range(2):
+                    traced(dummy)
+            print("✅ Traced CLIP image encoder")
+            return traced
+        except Exception as e:
+            print(f"⚠️ Could not trace CLIP image encoder, using eager mode: {e}")
+            return self.image_encoder
+    
     def _load_reference_images(self) -> None:
-        """Load and cache embeddings for all reference images."""
+        """Load reference embeddings from the disk cache, or compute and cache them."""
         if not self.reference_dir.exists():
             print(f"⚠️ Reference directory not found: {self.reference_dir}")
             return
         
-        # Find all supported image files
-        image_files = [
+        # Find all supported image files (sorted so the cache key is stable)
+        image_files = sorted(
             f for f in self.reference_dir.iterdir()
             if f.suffix.lower() in self.SUPPORTED_EXTENSIONS
-        ]
+        )
         
         if not image_files:
             print(f"⚠️ No reference images found in {self.reference_dir}")
             return
         
+        cache_path = self.reference_dir / self.CACHE_FILENAME
+        cache_key = self._reference_cache_key(image_files)
+        if self._load_cached_embeddings(cache_path, cache_key):
+            print(f"✅ Loaded {len(self.reference_names)} reference embeddings from cache")
+            return
+        
         print(f"📚 Loading {len(image_files)} reference images...")
         
+        # Embed in batches so only BATCH_SIZE decoded images are held in memory
         embeddings = []
-        for img_path in image_files:
-            try:
-                embedding = self._get_image_embedding(img_path)
-                embeddings.append(embedding)
-                self.reference_names.append(img_path.name)
-            except Exception as e:
-                print(f"❌ Error loading {img_path.name}: {e}")
+        for start in range(0, len(image_files), self.BATCH_SIZE):
+            images = []
+            for img_path in image_files[start:start + self.BATCH_SIZE]:
+                try:
+                    images.append(Image.open(img_path).convert("RGB"))
+                    self.reference_names.append(img_path.name)
+                except Exception as e:
+                    print(f"❌ Error loading {img_path.name}: {e}")
+            if images:
+                embeddings.append(self._embed_batch(images))
         
         if embeddings:
-            self.reference_embeddings = torch.cat(embeddings, dim=0)
-            print(f"✅ Loaded {len(embeddings)} reference embeddings")
+            embeddings = torch.cat(embeddings, dim=0)
+            self._set_reference_embeddings(embeddings)
+            print(f"✅ Loaded {len(self.reference_names)} reference embeddings")
+            self._save_cached_embeddings(cache_path, cache_key, embeddings)
         else:
             print("⚠️ No embeddings loaded")
     
-    def _get_image_embedding(self, image_path: Path | str) -> torch.Tensor:
+    def _reference_cache_key(self, image_files: list[Path]) -> str:
+        """Hash the model name and each reference file's name, size and mtime."""
+        digest = hashlib.sha256(f"{self.MODEL_NAME}:{self.CACHE_VERSION}".encode())
+        for img_path in image_files:
+            stat = img_path.stat()
+            digest.update(f"{img_path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()
+    
+    def _load_cached_embeddings(self, cache_path: Path, cache_key: str) -> bool:
+        """Restore reference embeddings from disk if the cache key matches."""
+        if not cache_path.exists():
+            return False
+        try:
+            cache = torch.load(cache_path, map_location=self.device, weights_only=True)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable embeddings cache: {e}")
+            return False
+        if cache.get("key") != cache_key:
+            return False
+        self._set_reference_embeddings(cache["embeddings"])
+        self.reference_names = list(cache["names"])
+        return True
+    
+    def _save_cached_embeddings(
+        self, cache_path: Path, cache_key: str, embeddings: torch.Tensor
+    ) -> None:
+        """Persist FP32 reference embeddings so the next startup skips recomputation."""
+        try:
+            torch.save({
+                "key": cache_key,
+                "names": self.reference_names,
+                "embeddings": embeddings.cpu(),
+            }, cache_path)
+        except Exception as e:
+            print(f"⚠️ Could not write embeddings cache: {e}")
+    
+    def _set_reference_embeddings(self, embeddings: torch.Tensor) -> None:
+        """
+        Store normalized (N, 512) embeddings as a contiguous (512, N) matrix.
+        
+        Keeping the matrix transposed and in half precision lets each query
+        run as a single GEMV over half the bytes of an FP32 copy.
+        """
+        self.reference_embeddings = embeddings.to(self.device, self.dtype).t().contiguous()
+        
+        # On CPU, large reference sets are searched as 8-bit codes (a quarter of
+        # the FP32 bytes); on GPU the FP16 matmul above is already the fast path
+        self.faiss_index = None
+        if (
+            FAISS_AVAILABLE
+            and self.device == "cpu"
+            and len(embeddings) >= self.FAISS_MIN_REFERENCES
+        ):
+            vectors = embeddings.float().cpu().numpy()
+            index = faiss.IndexScalarQuantizer(
+                vectors.shape[1], faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(vectors)
+            index.add(vectors)
+            self.faiss_index = index
+            print(f"✅ Built int8 FAISS index over {index.ntotal} references")
+    
+    def _top_k(self, query_embeddings: torch.Tensor, k: int) -> tuple[torch.Tensor, torch.Tensor]:
         """
-        Get CLIP embedding for a single image file.
+        Find the k most similar references for each query embedding.
         
         Args:
-            image_path: Path to the image file
+            query_embeddings: Normalized tensor of shape (Q, 512)
+            k: Number of matches to return per query
             
         Returns:
-            Normalized embedding tensor of shape (1, 512)
+            Tuple of FP32 similarities and reference indices, each of shape (Q, k),
+            sorted from best to worst match
         """
-        image = Image.open(image_path).convert("RGB")
-        return self._embed_image(image)
+        if self.faiss_index is not None:
+            similarities, indices = self.faiss_index.search(
+                query_embeddings.float().cpu().numpy(), k
+            )
+            return torch.from_numpy(similarities), torch.from_numpy(indices)
+        
+        query_embeddings = query_embeddings.to(self.reference_embeddings.dtype)
+        similarities = torch.mm(query_embeddings, self.reference_embeddings).float()
+        return similarities.topk(k, dim=-1)
+    
+    def _to_device(self, pixels: torch.Tensor) -> torch.Tensor:
+        """Move pixels to the model device, via pinned memory on CUDA for an async copy."""
+        if self.device == "cuda":
+            pixels = pixels.pin_memory()
+        return pixels.to(self.device, non_blocking=True)
     
-    def _embed_image(self, image: Image.Image) -> torch.Tensor:
+    def _resize_shape(self, height: int, width: int) -> tuple[int, int]:
         """
-        Get CLIP embedding for a PIL Image.
+        Output (height, width) of the shortest-edge resize.
+        
+        Matches transformers' get_resize_output_image_size, which truncates the
+        long side with int(), so tensor sizes agree with CLIPProcessor exactly.
+        """
+        short, long = (width, height) if width <= height else (height, width)
+        new_short, new_long = self.resize_size, int(self.resize_size * long / short)
+        return (new_long, new_short) if width <= height else (new_short, new_long)
+    
+    def _preprocess(self, image: ImageLike) -> torch.Tensor:
+        """
+        Convert an RGB image to normalized CLIP pixel values on the model device.
+        
+        Mirrors CLIPProcessor (bicubic resize of the shortest edge, center crop,
+        mean/std normalization) but runs as tensor ops after a single uint8
+        upload, so the heavy resize happens on the GPU when one is available.
         
         Args:
-            image: PIL Image object
+            image: RGB PIL Image or (H, W, 3) uint8 array
+            
+        Returns:
+            Pixel values tensor of shape (1, 3, 224, 224)
+        """
+        pixels = self._to_device(torch.from_numpy(np.array(image)))
+        pixels = pixels.permute(2, 0, 1).unsqueeze(0).float().div_(255)
+        
+        # Images decoded at resize_size (see decode_image) skip the resize entirely
+        height, width = pixels.shape[-2:]
+        size = self._resize_shape(height, width)
+        if size != (height, width):
+            pixels = F.interpolate(pixels, size=size, mode="bicubic", antialias=True, align_corners=False)
+            pixels = pixels.clamp_(0, 1)
+        
+        crop_height, crop_width = self.crop_size
+        top = (pixels.shape[-2] - crop_height) // 2
+        left = (pixels.shape[-1] - crop_width) // 2
+        pixels = pixels[..., top:top + crop_height, left:left + crop_width]
+        return (pixels - self.pixel_mean) / self.pixel_std
+    
+    def _embed_batch(self, images: list[ImageLike]) -> torch.Tensor:
+        """
+        Get CLIP embeddings for a batch of images in one forward pass.
+        
+        Args:
+            images: List of RGB PIL Images or (H, W, 3) uint8 arrays
+            
+        Returns:
+            Normalized FP32 embedding tensor of shape (len(images), 512)
+        """
+        with torch.inference_mode():
+            pixel_values = torch.cat([self._preprocess(image) for image in images])
+            with torch.autocast(device_type=self.device, dtype=self.dtype):
+                image_features = self.image_encoder(pixel_values)
+        
+        return F.normalize(image_features.float(), dim=-1)
+    
+    def _embed_image(self, image: ImageLike) -> torch.Tensor:
+        """
+        Get CLIP embedding for a single image.
+        
+        Args:
+            image: RGB PIL Image or (H, W, 3) uint8 array
             
         Returns:
             Normalized embedding tensor of shape (1, 512)
         """
-        inputs = self.processor(images=image, return_tensors="pt").to(self.device)
-        
-        with torch.no_grad():
-            outputs = self.model.get_image_features(**inputs)
-            # Handle both old (tensor) and new (object with .last_hidden_state) API
-            if hasattr(outputs, 'image_embeds'):
-                image_features = outputs.image_embeds
-            elif hasattr(outputs, 'pooler_output'):
-                image_features = outputs.pooler_output
-            elif isinstance(outputs, torch.Tensor):
-                image_features = outputs
-            else:
-                # Fallback: try to get the tensor directly
-                image_features = outputs
+        with torch.inference_mode():
+            image_features = self.traced_encoder(self._preprocess(image))
         
         # Normalize for cosine similarity
-        image_features = image_features / torch.norm(image_features, dim=-1, keepdim=True)
-        return image_features
+        return F.normalize(image_features, dim=-1)
     
-    def verify_image(self, image: Image.Image) -> dict:
+    def verify_image(self, image: ImageLike) -> dict:
         """
         Verify if an image matches Anna Laurini's artwork.
         
@@ -140,7 +420,7 @@ class CLIPService:
         - Higher threshold to reduce false positives
         
         Args:
-            image: PIL Image to verify
+            image: PIL Image or decoded (H, W, 3) uint8 array to verify
             
         Returns:
             Dictionary with verification results:
@@ -149,54 +429,72 @@ class CLIPService:
             - message: str
             - best_match: str (filename of closest reference)
         """
-        if self.reference_embeddings is None or len(self.reference_embeddings) == 0:
-            return {
+        return self.verify_batch([image])[0]
+    
+    def verify_batch(self, images: list[ImageLike]) -> list[dict]:
+        """
+        Verify several images with one CLIP forward pass and one similarity search.
+        
+        Args:
+            images: PIL Images or decoded (H, W, 3) uint8 arrays to verify
+            
+        Returns:
+            One result dictionary per image, in the same format as verify_image
+        """
+        if self.reference_embeddings is None or self.reference_embeddings.shape[1] == 0:
+            return [{
                 "is_verified": False,
                 "confidence": 0.0,
                 "message": "No reference images loaded. Please add reference artwork.",
                 "best_match": None
-            }
-        
-        # Get embedding for uploaded image
-        query_embedding = self._embed_image(image)
+            } for _ in images]
         
-        # Compute cosine similarity with all reference images
-        similarities = torch.mm(query_embedding, self.reference_embeddings.t()).squeeze(0)
-        
-        # Get the best match
-        best_similarity, best_idx = similarities.max(dim=0)
-        best_similarity = best_similarity.item()
-        best_match = self.reference_names[best_idx.item()]
+        # Get embeddings for uploaded images (traced single-image path when alone)
+        if len(images) == 1:
+            query_embeddings = self._embed_image(images[0])
+        else:
+            query_embeddings = self._embed_batch(images)
         
         # Use top-k average for more robust scoring (reduces noise from single outliers)
         # Scale k based on number of reference images: ~10% of references, min 3, max 10
         k = max(3, min(10, len(self.reference_names) // 10 + 1))
-        top_k_similarities, _ = similarities.topk(k)
-        avg_top_k = top_k_similarities.mean().item()
+        k = min(k, len(self.reference_names))
+        top_k_similarities, top_k_indices = self._top_k(query_embeddings, k)
+        top_k_similarities, top_k_indices = top_k_similarities.cpu(), top_k_indices.cpu()
+        avg_top_k = top_k_similarities.mean(dim=1).numpy()
         
         # Use the average of top-k for confidence calculation
         # This is more robust than using just the best match
-        confidence = self._scale_similarity(avg_top_k)
+        confidences = self._scale_similarity(avg_top_k)
         
-        # Determine verification status with stricter threshold
-        # Threshold raised to 80% to reduce false positives
-        if confidence >= 80:
-            is_verified = True
-            message = "✅ Verified! This looks like Anna Laurini's artwork!"
-        else:
-            is_verified = False
-            message = "❌ Not recognized as Anna Laurini's artwork."
-        
-        return {
-            "is_verified": is_verified,
-            "confidence": round(confidence, 1),
-            "message": message,
-            "best_match": best_match,
-            "raw_similarity": round(best_similarity, 4),
-            "avg_top_k_similarity": round(avg_top_k, 4)
-        }
+        results = []
+        # topk is sorted, so the first column holds each image's best match
+        for confidence, avg_similarity, best_similarity, best_idx in zip(
+            confidences.tolist(),
+            avg_top_k.tolist(),
+            top_k_similarities[:, 0].tolist(),
+            top_k_indices[:, 0].tolist(),
+        ):
+            # Determine verification status with stricter threshold
+            # Threshold raised to 80% to reduce false positives
+            if confidence >= 80:
+                is_verified = True
+                message = "✅ Verified! This looks like Anna Laurini's artwork!"
+            else:
+                is_verified = False
+                message = "❌ Not recognized as Anna Laurini's artwork."
+            
+            results.append({
+                "is_verified": is_verified,
+                "confidence": round(confidence, 1),
+                "message": message,
+                "best_match": self.reference_names[best_idx],
+                "raw_similarity": round(best_similarity, 4),
+                "avg_top_k_similarity": round(avg_similarity, 4)
+            })
+        return results
     
-    def _scale_similarity(self, similarity: float) -> float:
+    def _scale_similarity(self, similarity: float | np.ndarray) -> float | np.ndarray:
         """
         Scale raw CLIP similarity to a 0-100 confidence score.
         
@@ -213,27 +511,12 @@ class CLIPService:
         - 0.55-0.70 -> 50-75% (uncertain)
         - 0.40-0.55 -> 25-50% (unlikely)
         - < 0.40 -> 0-25% (no match)
+        
+        Accepts a single similarity or an array of them; the mapping is a
+        branchless interpolation that clamps inputs outside 0-1.
         """
-        # Clamp to valid range
-        similarity = max(0.0, min(1.0, similarity))
-        
-        # Piecewise linear scaling with cap at 100%
-        if similarity >= 0.80:
-            # 0.80-1.00 -> 90-100% (capped)
-            score = 90 + (similarity - 0.80) / 0.20 * 10
-            return min(100.0, score)
-        elif similarity >= 0.70:
-            # 0.70-0.80 -> 75-90%
-            return 75 + (similarity - 0.70) / 0.10 * 15
-        elif similarity >= 0.55:
-            # 0.55-0.70 -> 50-75%
-            return 50 + (similarity - 0.55) / 0.15 * 25
-        elif similarity >= 0.40:
-            # 0.40-0.55 -> 25-50%
-            return 25 + (similarity - 0.40) / 0.15 * 25
-        else:
-            # 0.00-0.40 -> 0-25%
-            return similarity / 0.40 * 25
+        scores = np.interp(similarity, self.SIMILARITY_KNOTS, self.CONFIDENCE_KNOTS)
+        return float(scores) if np.ndim(scores) == 0 else scores
     
     def get_reference_count(self) -> int:
         """Return the number of loaded reference images."""
@@ -243,6 +526,7 @@ class CLIPService:
         """Reload reference images from disk."""
         self.reference_embeddings = None
         self.reference_names = []
+        self.faiss_index = None
         self._load_reference_images()
 
 
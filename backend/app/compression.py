@@ -0,0 +1,95 @@
+"""
+Response compression limited to text payloads.
+
+JPEGs from the gallery image endpoint and binary frontend assets are already
+compressed, so gzipping them only costs CPU.
+"""
+
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Content types worth gzipping (besides text/*)
+COMPRESSIBLE_TYPES = {
+    "application/json", "application/javascript", "application/xml", "image/svg+xml",
+}
+
+# zlib window bits that produce a gzip header and trailer
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def _is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+
+class TextGZipMiddleware:
+    """Gzip JSON and text responses of at least `minimum_size` bytes."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, compresslevel: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get("Accept-Encoding", ""):
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message = {}
+        compress = False
+        started = False
+        compressor = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, compress, started, compressor
+
+            if message["type"] == "http.response.start":
+                # Hold the headers back until the first body chunk shows the size
+                headers = Headers(raw=message["headers"])
+                start_message = message
+                compress = (
+                    "content-encoding" not in headers
+                    and _is_compressible(headers.get("content-type", ""))
+                )
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if not started:
+                started = True
+                if not compress or (not more_body and len(body) < self.minimum_size):
+                    compress = False
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, GZIP_WBITS)
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers["Content-Encoding"] = "gzip"
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = compressor.compress(body) + compressor.flush()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start_message)
+
+            if not compress:
+                await send(message)
+                return
+
+            chunk = compressor.compress(body)
+            chunk += compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -3,10 +3,11 @@ Database configuration for Spot the Artist.
 Uses Cloud Firestore via Firebase Admin SDK.
 """
 
-from firebase_admin import firestore
+from firebase_admin import firestore, firestore_async
 
-# Firestore client (lazy-initialized)
+# Firestore clients (lazy-initialized)
 _db = None
+_async_db = None
 
 
 def get_db():
@@ -17,6 +18,14 @@ def get_db():
     return _db
 
 
+def get_async_db():
+    """Get async Firestore client instance for use from coroutines on the event loop."""
+    global _async_db
+    if _async_db is None:
+        _async_db = firestore_async.client()
+    return _async_db
+
+
 def init_db():
     """Initialize database connection. Firestore creates collections on first write."""
     get_db()
@@ -1,23 +1,50 @@
 """
 Gallery service for managing shared artwork images.
 Uses Cloud Firestore for storage.
-Images are compressed to fit within Firestore's 1MB document limit.
+Images are compressed to fit within Firestore's 1MB document limit and stored
+as raw JPEG bytes (older documents hold a base64 data URL in `image_data`).
 """
 
+import asyncio
 import base64
+import binascii
+import hashlib
 import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional, List
+from cachetools import LRUCache, TTLCache, cached
 from pydantic import BaseModel
 from PIL import Image
 
 from firebase_admin import firestore
 from .database import get_db
+from .auth import invalidate_user_stats
 
 # Max image dimension (width or height) for gallery storage
 MAX_IMAGE_SIZE = 800
 # JPEG quality for compression
 JPEG_QUALITY = 70
+# Resampling filter for downscaling (compute/quality knob)
+RESAMPLE = Image.BICUBIC
+# Fields returned by list queries (everything except the image blob)
+LIST_FIELDS = [
+    "user_id", "username", "is_verified", "confidence", "message",
+    "best_match", "location", "notes", "created_at",
+]
+
+# Threads for Pillow decode/resize/encode, which release the GIL inside libjpeg
+_image_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="gallery-image")
+
+# Compressed output of recent uploads, keyed by a hash of the decoded upload
+_compressed_cache = LRUCache(maxsize=256)
+_compressed_cache_lock = threading.Lock()
+
+# Gallery-wide counts, recomputed at most every 30s or after a save/delete
+_stats_cache = TTLCache(maxsize=1, ttl=30)
 
 
 # Pydantic models
@@ -33,11 +60,11 @@ class GalleryImageCreate(BaseModel):
 
 
 class GalleryImageResponse(BaseModel):
-    """Response model for gallery image."""
+    """Response model for gallery image (the image itself is served from image_url)."""
     id: str
     user_id: str
     username: str
-    image_data: str
+    image_url: str
     is_verified: bool
     confidence: float
     message: Optional[str]
@@ -47,47 +74,87 @@ class GalleryImageResponse(BaseModel):
     created_at: datetime
 
 
+class GalleryImageDetailResponse(GalleryImageResponse):
+    """Response model for a single gallery image, with the image embedded."""
+    image_data: str  # Base64 data URL
+
+
 class GalleryListResponse(BaseModel):
     """Response model for gallery list."""
     items: List[GalleryImageResponse]
-    total: int
+    total: Optional[int] = None  # Only counted when include_total is requested
     page: int
     per_page: int
     has_more: bool
+    next_cursor: Optional[str] = None
+
 
+def gallery_image_url(item_id: str) -> str:
+    """URL that serves the stored image for a gallery item."""
+    return f"/api/gallery/{item_id}/image"
 
-def _compress_image(base64_data: str) -> str:
-    """Compress and resize a base64 image to fit within Firestore limits."""
+
+def _compress_image(base64_data: str) -> bytes:
+    """Compress and resize a base64 image to JPEG bytes that fit within Firestore limits."""
     # Strip data URL prefix if present
     if "," in base64_data:
         base64_data = base64_data.split(",", 1)[1]
 
     image_bytes = base64.b64decode(base64_data)
-    img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+
+    # Re-uploads of the same image (e.g. a retried save) reuse the earlier result
+    key = hashlib.blake2b(image_bytes, digest_size=8).digest()
+    with _compressed_cache_lock:
+        compressed = _compressed_cache.get(key)
+    if compressed is None:
+        compressed = _compress_image_bytes(image_bytes)
+        with _compressed_cache_lock:
+            _compressed_cache[key] = compressed
+    return compressed
+
+
+def _open_for_thumbnail(image_bytes: bytes) -> Image.Image:
+    """Open raw image bytes, letting libjpeg decode large JPEGs at reduced scale."""
+    img = Image.open(io.BytesIO(image_bytes))
+
+    # libjpeg picks the largest 1/2, 1/4 or 1/8 scale that still covers the box,
+    # so passing the final size lets a 4032x3024 photo decode at 2016x1512
+    # (no-op for other formats)
+    img.draft("RGB", (MAX_IMAGE_SIZE, MAX_IMAGE_SIZE))
+    return img
+
+
+def _compress_image_bytes(image_bytes: bytes) -> bytes:
+    """Downscale and re-encode raw image bytes as JPEG."""
+    img = _open_for_thumbnail(image_bytes).convert("RGB")
 
     # Resize if too large
-    img.thumbnail((MAX_IMAGE_SIZE, MAX_IMAGE_SIZE), Image.LANCZOS)
+    img.thumbnail((MAX_IMAGE_SIZE, MAX_IMAGE_SIZE), RESAMPLE)
 
     # Compress as JPEG
     buffer = io.BytesIO()
     img.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
-    compressed = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    return buffer.getvalue()
+
 
-    return f"data:image/jpeg;base64,{compressed}"
+def _to_data_url(image_bytes: bytes) -> str:
+    """Encode stored JPEG bytes as a data URL for clients that embed the image."""
+    return f"data:image/jpeg;base64,{base64.b64encode(image_bytes).decode('utf-8')}"
 
 
-def save_to_gallery(user: dict, image_data: GalleryImageCreate) -> dict:
+async def save_to_gallery(user: dict, image_data: GalleryImageCreate) -> dict:
     """Save an image to the gallery."""
     db = get_db()
     now = datetime.utcnow()
 
-    # Compress image to fit Firestore document size limit
-    compressed_image = _compress_image(image_data.image_data)
+    # Compress image to fit Firestore document size limit, off the event loop
+    loop = asyncio.get_running_loop()
+    compressed_image = await loop.run_in_executor(_image_pool, _compress_image, image_data.image_data)
 
     doc_data = {
         "user_id": user["id"],
         "username": user["username"],
-        "image_data": compressed_image,
+        "image_bytes": compressed_image,
         "is_verified": image_data.is_verified,
         "confidence": image_data.confidence,
         "message": image_data.message,
@@ -97,32 +164,68 @@ def save_to_gallery(user: dict, image_data: GalleryImageCreate) -> dict:
         "created_at": now,
     }
 
-    # Add to gallery collection
-    _, doc_ref = db.collection("gallery").add(doc_data)
-
-    # Update user stats
+    # Add to gallery collection and update user stats in one batched commit
+    doc_ref = db.collection("gallery").document()
     user_ref = db.collection("users").document(user["id"])
     updates = {"arts_spotted": firestore.Increment(1)}
     if image_data.is_verified:
         updates["verified_spots"] = firestore.Increment(1)
-    user_ref.update(updates)
+
+    batch = db.batch()
+    batch.set(doc_ref, doc_data)
+    batch.update(user_ref, updates)
+    # Synchronous RPC; run it in a thread so the event loop stays free
+    await asyncio.to_thread(batch.commit)
+    invalidate_user_stats(user["id"])
+    _stats_cache.clear()
 
     doc_data["id"] = doc_ref.id
     return doc_data
 
 
-def get_gallery_items(
+def _encode_cursor(created_at: datetime, item_id: str) -> str:
+    """Encode the sort key of the last item on a page as an opaque cursor."""
+    raw = json.dumps({"created_at": created_at.isoformat(), "id": item_id})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Decode a cursor from _encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at, item_id = datetime.fromisoformat(data["created_at"]), data["id"]
+    except (binascii.Error, KeyError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(item_id, str) or not item_id:
+        raise ValueError("Invalid cursor")
+    return created_at, item_id
+
+
+async def get_gallery_items(
     page: int = 1,
     per_page: int = 20,
     user_id: Optional[str] = None,
-    verified_only: bool = False
+    verified_only: bool = False,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
 ) -> GalleryListResponse:
-    """Get paginated gallery items."""
+    """
+    Get paginated gallery items, newest first.
+
+    Pass the previous response's next_cursor as `cursor` to fetch the
+    following page without Firestore skipping over earlier documents;
+    `page` is only used when no cursor is given. The total number of
+    matching items costs an extra aggregation query, so it is only
+    computed when `include_total` is set.
+    """
     db = get_db()
     collection_ref = db.collection("gallery")
 
-    # Build query
-    query = collection_ref.order_by("created_at", direction=firestore.Query.DESCENDING)
+    # Build query (document ID breaks ties between equal timestamps)
+    query = (
+        collection_ref.order_by("created_at", direction=firestore.Query.DESCENDING)
+        .order_by("__name__", direction=firestore.Query.DESCENDING)
+    )
 
     if user_id is not None:
         query = query.where("user_id", "==", user_id)
@@ -130,24 +233,42 @@ def get_gallery_items(
     if verified_only:
         query = query.where("is_verified", "==", True)
 
-    # Get total count
-    count_query = query.count()
-    count_result = count_query.get()
-    total = count_result[0][0].value
-
-    # Paginate
-    offset = (page - 1) * per_page
-    paginated_query = query.offset(offset).limit(per_page)
-    docs = paginated_query.stream()
-
+    if cursor is not None:
+        created_at, item_id = _decode_cursor(cursor)
+        paginated_query = query.start_after({
+            "created_at": created_at,
+            "__name__": collection_ref.document(item_id),
+        })
+    else:
+        paginated_query = query.offset((page - 1) * per_page)
+
+    # Leave the image blob out of the list payload, and fetch one extra
+    # document to learn whether another page exists
+    page_query = paginated_query.select(LIST_FIELDS).limit(per_page + 1)
+
+    if not include_total:
+        total = None
+        docs = await asyncio.to_thread(page_query.get)
+    else:
+        # Run the total count and the page fetch concurrently
+        count_result, docs = await asyncio.gather(
+            asyncio.to_thread(query.count().get),
+            asyncio.to_thread(page_query.get),
+        )
+        total = count_result[0][0].value
+
+    has_more = len(docs) > per_page
+    docs = docs[:per_page]
+
+    # Documents come from our own writes, so skip re-validating every field
     items = []
     for doc in docs:
         data = doc.to_dict()
-        items.append(GalleryImageResponse(
+        items.append(GalleryImageResponse.model_construct(
             id=doc.id,
             user_id=data.get("user_id", ""),
             username=data.get("username", "Unknown"),
-            image_data=data.get("image_data", ""),
+            image_url=gallery_image_url(doc.id),
             is_verified=data.get("is_verified", False),
             confidence=data.get("confidence", 0.0),
             message=data.get("message"),
@@ -157,12 +278,17 @@ def get_gallery_items(
             created_at=data.get("created_at", datetime.utcnow()),
         ))
 
+    next_cursor = None
+    if has_more and items:
+        next_cursor = _encode_cursor(items[-1].created_at, items[-1].id)
+
     return GalleryListResponse(
         items=items,
         total=total,
         page=page,
         per_page=per_page,
-        has_more=(page * per_page) < total,
+        has_more=has_more,
+        next_cursor=next_cursor,
     )
 
 
@@ -174,33 +300,65 @@ def get_gallery_item(item_id: str) -> Optional[dict]:
         return None
     data = doc.to_dict()
     data["id"] = doc.id
+    image_bytes = data.pop("image_bytes", None)
+    if image_bytes is not None:
+        data["image_data"] = _to_data_url(image_bytes)
     return data
 
 
-def delete_gallery_item(item_id: str, user: dict) -> bool:
-    """Delete a gallery item. User can only delete their own images."""
+def get_gallery_image_bytes(item_id: str) -> Optional[tuple[bytes, str]]:
+    """Get a gallery item's image as raw bytes and its media type."""
     db = get_db()
-    doc_ref = db.collection("gallery").document(item_id)
-    doc = doc_ref.get()
+    doc = db.collection("gallery").document(item_id).get(field_paths=["image_bytes", "image_data"])
+    if not doc.exists:
+        return None
+
+    data = doc.to_dict()
+    if data.get("image_bytes") is not None:
+        return data["image_bytes"], "image/jpeg"
+
+    # Legacy documents store a data URL: "data:image/jpeg;base64,<payload>"
+    header, _, payload = data.get("image_data", "").partition(",")
+    media_type = header.removeprefix("data:").split(";")[0] or "image/jpeg"
+    return base64.b64decode(payload), media_type
+
+
+@firestore.transactional
+def _delete_owned_item(transaction, doc_ref, user_ref, user_id: str) -> bool:
+    """Delete a gallery document and decrement its owner's stats in one transaction."""
+    # Only the ownership and verification fields are needed, not the image
+    doc = doc_ref.get(field_paths=["user_id", "is_verified"], transaction=transaction)
 
     if not doc.exists:
         return False
 
     data = doc.to_dict()
-    if data.get("user_id") != user["id"]:
+    if data.get("user_id") != user_id:
         return False
 
     # Update user stats
-    user_ref = db.collection("users").document(user["id"])
     updates = {"arts_spotted": firestore.Increment(-1)}
     if data.get("is_verified"):
         updates["verified_spots"] = firestore.Increment(-1)
-    user_ref.update(updates)
-
-    doc_ref.delete()
+    transaction.update(user_ref, updates)
+    transaction.delete(doc_ref)
     return True
 
 
+def delete_gallery_item(item_id: str, user: dict) -> bool:
+    """Delete a gallery item. User can only delete their own images."""
+    db = get_db()
+    doc_ref = db.collection("gallery").document(item_id)
+    user_ref = db.collection("users").document(user["id"])
+
+    deleted = _delete_owned_item(db.transaction(), doc_ref, user_ref, user["id"])
+    if deleted:
+        invalidate_user_stats(user["id"])
+        _stats_cache.clear()
+    return deleted
+
+
+@cached(_stats_cache)
 def get_gallery_stats() -> dict:
     """Get overall gallery statistics."""
     db = get_db()
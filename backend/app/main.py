@@ -5,17 +5,22 @@ FastAPI server that handles database operations (auth, gallery) locally
 and can run CLIP verification either locally or via a remote backend.
 """
 
-import os
+import asyncio
+import hashlib
 import io
+import logging
+import os
+import time
 import httpx
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from typing import Optional
+from cachetools import LRUCache
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
 from PIL import Image
 
@@ -25,13 +30,16 @@ from .auth import (
     get_current_user, get_leaderboard,
 )
 from .gallery_service import (
-    GalleryImageCreate, GalleryImageResponse, GalleryListResponse,
-    save_to_gallery, get_gallery_items, get_gallery_item, delete_gallery_item,
-    get_gallery_stats
+    GalleryImageCreate, GalleryImageResponse, GalleryImageDetailResponse, GalleryListResponse,
+    save_to_gallery, get_gallery_items, get_gallery_item, get_gallery_image_bytes,
+    delete_gallery_item, get_gallery_stats, gallery_image_url
 )
 
 # Import CLIP service for local verification
-from .clip_service import get_clip_service, CLIPService
+from .clip_service import get_clip_service, decode_image, CLIPService
+from .verification_batcher import VerificationBatcher
+from .static_files import SPAStaticFiles, ImmutableAssetsMiddleware
+from .compression import TextGZipMiddleware
 
 
 # Response models
@@ -52,6 +60,8 @@ class HealthResponse(BaseModel):
     database_connected: bool = True
 
 
+logger = logging.getLogger("spot_the_artist")
+
 # Remote CLIP backend URL (Colab with ngrok)
 # If not set, will use local CLIP service
 CLIP_BACKEND_URL = os.environ.get("CLIP_BACKEND_URL", "")
@@ -65,23 +75,47 @@ http_client: httpx.AsyncClient | None = None
 # Local CLIP service (when running standalone)
 clip_service: CLIPService | None = None
 
+# Micro-batching of concurrent local verifications
+VERIFY_MAX_BATCH = int(os.environ.get("VERIFY_MAX_BATCH", "8"))
+VERIFY_MAX_WAIT_MS = float(os.environ.get("VERIFY_MAX_WAIT_MS", "10"))
+verify_batcher: VerificationBatcher | None = None
+
+# Single inference thread, so CLIP calls never block the event loop or contend for the device
+clip_executor: ThreadPoolExecutor | None = None
+
+# Results for recently verified uploads, keyed by a hash of the uploaded bytes
+# (retries and re-verifies of the same photo skip CLIP entirely)
+verify_cache: LRUCache = LRUCache(maxsize=2048)
+
+# Largest accepted upload for verification, read in chunks of UPLOAD_CHUNK_SIZE
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", "25000000"))
+UPLOAD_CHUNK_SIZE = 1 << 20
+
 # Supported image content types (including HEIC)
 SUPPORTED_IMAGE_TYPES = {
     "image/jpeg", "image/jpg", "image/png", "image/webp",
     "image/heic", "image/heif"
 }
 
+# Extensions accepted when the browser sends a generic or missing MIME type
+SUPPORTED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".heic", ".heif"}
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize CLIP service and HTTP client on startup."""
-    global http_client, clip_service
+    global http_client, clip_service, verify_batcher, clip_executor
 
     # Initialize Firestore
     init_db()
 
-    # Initialize HTTP client for proxying to Colab (if using remote backend)
-    http_client = httpx.AsyncClient(timeout=60.0)
+    # Initialize HTTP client for proxying to Colab (if using remote backend);
+    # HTTP/2 multiplexes concurrent proxy requests over pooled TLS connections
+    http_client = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(60.0, connect=5.0),
+        limits=httpx.Limits(max_keepalive_connections=64, max_connections=128),
+    )
 
     if CLIP_BACKEND_URL:
         print(f"🔗 Using remote CLIP backend: {CLIP_BACKEND_URL}")
@@ -91,6 +125,24 @@ async def lifespan(app: FastAPI):
         try:
             clip_service = get_clip_service(REFERENCE_ART_DIR)
             print(f"✅ Local CLIP service ready with {clip_service.get_reference_count()} reference images")
+
+            # The traced single-image encoder is warmed when it's built; warm the
+            # eager batched autocast path the VerificationBatcher uses, so the first
+            # concurrent requests don't pay its kernel selection and allocation costs
+            try:
+                start = time.perf_counter()
+                dummies = [Image.new("RGB", (224, 224)) for _ in range(2)]
+                for _ in range(2):
+                    clip_service.verify_batch(dummies)
+                print(f"⚡ Warmup took {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                print(f"⚠️ CLIP warmup failed: {e}")
+
+            clip_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clip")
+            verify_batcher = VerificationBatcher(
+                clip_service, VERIFY_MAX_BATCH, VERIFY_MAX_WAIT_MS, executor=clip_executor
+            )
+            verify_batcher.start()
         except Exception as e:
             print(f"❌ Failed to load CLIP service: {e}")
             clip_service = None
@@ -98,6 +150,10 @@ async def lifespan(app: FastAPI):
     yield
 
     # Cleanup
+    if verify_batcher:
+        await verify_batcher.stop()
+    if clip_executor:
+        clip_executor.shutdown(wait=True)
     if http_client:
         await http_client.aclose()
     print("👋 Shutting down")
@@ -108,7 +164,8 @@ app = FastAPI(
     title="Anna Laurini Art Verification API",
     description="AI-powered verification of Anna Laurini street art using CLIP",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS for frontend
@@ -120,15 +177,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON and text assets (gallery listings are mostly repetitive text);
+# images pass through uncompressed
+app.add_middleware(TextGZipMiddleware, minimum_size=1024, compresslevel=5)
+
 
 # Global exception handler to always return JSON errors
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Catch all unhandled exceptions and return them as JSON."""
-    import traceback
-    print(f"❌ Unhandled exception: {exc}")
-    traceback.print_exc()
-    return JSONResponse(
+    logger.exception("❌ Unhandled exception on %s %s", request.method, request.url.path)
+    return ORJSONResponse(
         status_code=500,
         content={"detail": str(exc)}
     )
@@ -146,6 +205,24 @@ async def health_check():
     )
 
 
+def upload_cache_key(contents: bytearray) -> bytes:
+    """Content hash identifying an upload in verify_cache."""
+    return hashlib.blake2b(contents, digest_size=16).digest()
+
+
+async def read_upload(file: UploadFile) -> bytearray:
+    """Read an upload in chunks, rejecting it as soon as it exceeds MAX_UPLOAD_BYTES."""
+    contents = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        if len(contents) + len(chunk) > MAX_UPLOAD_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Image too large. Maximum size is {MAX_UPLOAD_BYTES // 1_000_000} MB."
+            )
+        contents.extend(chunk)
+    return contents
+
+
 @app.post("/api/verify", response_model=VerificationResponse, tags=["Verification"])
 async def verify_artwork(file: UploadFile = File(...)):
     """
@@ -154,14 +231,14 @@ async def verify_artwork(file: UploadFile = File(...)):
     Uses local CLIP service or proxies to remote backend if configured.
     Supports JPEG, PNG, WebP, and HEIC/HEIF image formats.
     """
-    # Validate file type (support HEIC and standard formats)
-    content_type = file.content_type or ""
-    filename = file.filename or ""
+    # Validate file type before reading anything (support HEIC and standard formats)
+    content_type = (file.content_type or "").lower()
+    extension = Path(file.filename or "").suffix.lower()
 
-    # Check by content type or file extension for HEIC (some browsers don't send correct MIME)
+    # Check by content type or file extension (some browsers don't send correct MIME for HEIC)
     is_valid_type = (
-        content_type.startswith("image/") or
-        filename.lower().endswith(('.heic', '.heif'))
+        content_type in SUPPORTED_IMAGE_TYPES or
+        extension in SUPPORTED_IMAGE_EXTENSIONS
     )
 
     if not is_valid_type:
@@ -170,13 +247,22 @@ async def verify_artwork(file: UploadFile = File(...)):
             detail="Invalid file type. Please upload an image (JPEG, PNG, WebP, HEIC)."
         )
 
-    try:
-        # Read file contents
-        contents = await file.read()
+    # Read file contents (fails fast on oversized uploads)
+    contents = await read_upload(file)
+
+    # Hash large uploads off the event loop (hashlib releases the GIL)
+    if len(contents) > UPLOAD_CHUNK_SIZE:
+        cache_key = await asyncio.to_thread(upload_cache_key, contents)
+    else:
+        cache_key = upload_cache_key(contents)
+    cached = verify_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
+    try:
         # Use remote backend if configured
         if CLIP_BACKEND_URL:
-            files = {"file": (file.filename, contents, file.content_type)}
+            files = {"file": (file.filename, io.BytesIO(contents), file.content_type)}
             response = await http_client.post(
                 f"{CLIP_BACKEND_URL}/api/verify",
                 files=files,
@@ -189,32 +275,41 @@ async def verify_artwork(file: UploadFile = File(...)):
 
             result = response.json()
 
-            return VerificationResponse(
+            verification = VerificationResponse(
                 is_verified=result["is_verified"],
                 confidence=result["confidence"],
                 message=result["message"],
                 best_match=result.get("best_match")
             )
+            verify_cache[cache_key] = verification
+            return verification
 
         # Use local CLIP service
-        if clip_service is None:
+        if verify_batcher is None:
             raise HTTPException(
                 status_code=503,
                 detail="CLIP service not available. Please try again later."
             )
 
-        # Load image with PIL (supports HEIC via pillow-heif)
-        image = Image.open(io.BytesIO(contents)).convert("RGB")
+        # Decode straight to an RGB array (libvips, or Pillow + pillow-heif for HEIC
+        # and as fallback), off the event loop since large photos take a while.
+        # libvips shrinks JPEGs on load to CLIP's input size
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(
+            None, decode_image, bytes(contents), clip_service.resize_size
+        )
 
-        # Verify with local CLIP
-        result = clip_service.verify_image(image)
+        # Verify with local CLIP, batched with any concurrent requests
+        result = await verify_batcher.verify(image)
 
-        return VerificationResponse(
+        verification = VerificationResponse(
             is_verified=result["is_verified"],
             confidence=result["confidence"],
             message=result["message"],
             best_match=result.get("best_match")
         )
+        verify_cache[cache_key] = verification
+        return verification
 
     except httpx.RequestError as e:
         raise HTTPException(
@@ -235,7 +330,16 @@ async def verify_artwork(file: UploadFile = File(...)):
 @app.get("/api/auth/me", response_model=UserResponse, tags=["Authentication"])
 async def get_current_user_info(user: dict = Depends(get_current_user)):
     """Get the current authenticated user's information."""
-    return UserResponse(**user)
+    # The user record comes from our own Firestore writes, so skip re-validation,
+    # but default the counters like the leaderboard does so the contract holds
+    return UserResponse.model_construct(
+        id=user["id"],
+        username=user["username"],
+        email=user["email"],
+        arts_spotted=user.get("arts_spotted", 0),
+        verified_spots=user.get("verified_spots", 0),
+        created_at=user["created_at"],
+    )
 
 
 @app.get("/api/leaderboard", response_model=list[LeaderboardEntry], tags=["Users"])
@@ -258,13 +362,13 @@ async def add_to_gallery(
 
     Requires authentication. The image will be associated with the current user.
     """
-    gallery_image = save_to_gallery(user, image_data)
+    gallery_image = await save_to_gallery(user, image_data)
 
-    return GalleryImageResponse(
+    return GalleryImageResponse.model_construct(
         id=gallery_image["id"],
         user_id=gallery_image["user_id"],
         username=gallery_image["username"],
-        image_data=gallery_image["image_data"],
+        image_url=gallery_image_url(gallery_image["id"]),
         is_verified=gallery_image["is_verified"],
         confidence=gallery_image["confidence"],
         message=gallery_image.get("message"),
@@ -275,12 +379,16 @@ async def add_to_gallery(
     )
 
 
-@app.get("/api/gallery", response_model=GalleryListResponse, tags=["Gallery"])
+# Gallery reads return ORJSONResponse directly so FastAPI doesn't re-validate
+# models we just built; `responses` keeps them documented in the schema
+@app.get("/api/gallery", responses={200: {"model": GalleryListResponse}}, tags=["Gallery"])
 async def list_gallery(
     page: int = Query(default=1, ge=1),
     per_page: int = Query(default=20, ge=1, le=100),
     user_id: Optional[str] = Query(default=None),
     verified_only: bool = Query(default=False),
+    cursor: Optional[str] = Query(default=None),
+    include_total: bool = Query(default=False),
 ):
     """
     Get the shared gallery of all uploaded artworks.
@@ -288,8 +396,15 @@ async def list_gallery(
     - Public endpoint (no authentication required)
     - Returns paginated results, newest first
     - Can filter by user_id or verified_only
+    - Pass `next_cursor` from a response as `cursor` to fetch the next page
+    - Set include_total to also count all matching items
     """
-    return get_gallery_items(page, per_page, user_id, verified_only)
+    try:
+        gallery = await get_gallery_items(page, per_page, user_id, verified_only, cursor, include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return ORJSONResponse(gallery.model_dump(mode="json"))
 
 
 @app.get("/api/gallery/stats", tags=["Gallery"])
@@ -298,7 +413,7 @@ async def gallery_stats():
     return get_gallery_stats()
 
 
-@app.get("/api/gallery/{item_id}", response_model=GalleryImageResponse, tags=["Gallery"])
+@app.get("/api/gallery/{item_id}", responses={200: {"model": GalleryImageDetailResponse}}, tags=["Gallery"])
 async def get_gallery_image(item_id: str):
     """Get a specific gallery image by ID."""
     item = get_gallery_item(item_id)
@@ -306,11 +421,12 @@ async def get_gallery_image(item_id: str):
     if item is None:
         raise HTTPException(status_code=404, detail="Image not found")
 
-    return GalleryImageResponse(
+    response = GalleryImageDetailResponse.model_construct(
         id=item["id"],
         user_id=item["user_id"],
         username=item.get("username", "Unknown"),
         image_data=item["image_data"],
+        image_url=gallery_image_url(item["id"]),
         is_verified=item.get("is_verified", False),
         confidence=item.get("confidence", 0.0),
         message=item.get("message"),
@@ -319,6 +435,26 @@ async def get_gallery_image(item_id: str):
         notes=item.get("notes"),
         created_at=item.get("created_at"),
     )
+    return ORJSONResponse(response.model_dump(mode="json"))
+
+
+@app.get("/api/gallery/{item_id}/image", tags=["Gallery"])
+async def get_gallery_image_file(item_id: str):
+    """Serve a gallery image as binary so browsers can cache it."""
+    # Blocking Firestore read of up to ~1MB; keep it off the event loop since
+    # every gallery card requests its image
+    image = await asyncio.to_thread(get_gallery_image_bytes, item_id)
+
+    if image is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    content, media_type = image
+    # Gallery images are never modified, so they can be cached indefinitely
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
 
 
 @app.delete("/api/gallery/{item_id}", tags=["Gallery"])
@@ -357,29 +493,13 @@ for path in possible_frontend_paths:
         break
 
 if frontend_build:
-    # Mount assets directory
-    assets_dir = frontend_build / "assets"
-    if assets_dir.exists():
-        app.mount("/assets", StaticFiles(directory=assets_dir), name="assets")
-
-    @app.get("/", tags=["Frontend"])
-    async def serve_frontend():
-        """Serve the React frontend."""
-        return FileResponse(frontend_build / "index.html")
-
-    @app.get("/{full_path:path}", tags=["Frontend"])
-    async def serve_frontend_routes(full_path: str):
-        """Serve React frontend for all routes (SPA support)."""
-        # Check if it's an API route
-        if full_path.startswith("api/"):
-            raise HTTPException(status_code=404, detail="API endpoint not found")
-
-        # Check if file exists in static folder
-        file_path = frontend_build / full_path
-        if file_path.exists() and file_path.is_file():
-            return FileResponse(file_path)
-
-        # Return index.html for SPA routing
-        return FileResponse(frontend_build / "index.html")
+    @app.get("/api/{path:path}", include_in_schema=False)
+    async def api_not_found(path: str):
+        """Keep unknown API routes from falling through to the SPA."""
+        raise HTTPException(status_code=404, detail="API endpoint not found")
+
+    # Mounted last so it only sees requests no API route matched
+    app.mount("/", SPAStaticFiles(directory=frontend_build, html=True), name="frontend")
+    app.add_middleware(ImmutableAssetsMiddleware, prefix="/assets/")
 else:
     print("⚠️ Frontend build not found - API-only mode")
@@ -0,0 +1,48 @@
+"""
+Static serving for the built React frontend.
+
+Files are resolved by Starlette's StaticFiles rather than a Python route per
+request; unknown paths fall back to index.html so client-side routes work.
+"""
+
+from starlette.datastructures import MutableHeaders
+from starlette.exceptions import HTTPException
+from starlette.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class SPAStaticFiles(StaticFiles):
+    """StaticFiles that serves index.html for paths that aren't files (SPA support)."""
+
+    async def get_response(self, path: str, scope: Scope):
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as e:
+            # Missing build assets are real 404s; anything else is a client-side route
+            if e.status_code != 404 or path.startswith("assets/"):
+                raise
+            return await super().get_response("index.html", scope)
+
+
+class ImmutableAssetsMiddleware:
+    """Mark successful responses under `prefix` as cacheable forever.
+
+    Vite fingerprints every file in /assets, so a changed file gets a new URL.
+    """
+
+    def __init__(self, app: ASGIApp, prefix: str = "/assets/"):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cache_control(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = MutableHeaders(scope=message)
+                headers["Cache-Control"] = "public, max-age=31536000, immutable"
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_control)
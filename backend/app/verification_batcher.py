@@ -0,0 +1,117 @@
+"""
+Micro-batching for CLIP verification.
+
+Concurrent /api/verify requests are queued and handed to the CLIP service
+together, so one forward pass and one similarity search serve the whole batch.
+"""
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Optional
+
+from .clip_service import CLIPService, ImageLike
+
+
+class VerificationBatcher:
+    """Coalesces concurrent verification requests into batched CLIP calls."""
+
+    def __init__(
+        self,
+        clip_service: CLIPService,
+        max_batch: int = 8,
+        max_wait_ms: float = 10.0,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        Args:
+            clip_service: Service used to verify each batch
+            max_batch: Maximum number of images per forward pass
+            max_wait_ms: How long the first request in a batch waits for others to join
+            executor: Where batches run (defaults to the event loop's default executor)
+        """
+        self.clip_service = clip_service
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self._queue: asyncio.Queue[tuple[ImageLike, asyncio.Future]] = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight: list[tuple[ImageLike, asyncio.Future]] = []
+
+    def start(self) -> None:
+        """Start the background worker. Must be called from the running event loop."""
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker and fail any requests still in flight or waiting in the queue."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        pending = [future for _, future in self._in_flight]
+        self._in_flight = []
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            pending.append(future)
+        for future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Verification service shutting down"))
+
+    async def verify(self, image: ImageLike) -> dict:
+        """Queue an image for verification and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+
+    async def _run(self) -> None:
+        """Drain the queue in batches of up to max_batch images."""
+        while True:
+            # Tracked as in flight from the moment it leaves the queue, so stop() can fail it
+            batch = self._in_flight = [await self._queue.get()]
+
+            # Give concurrent requests a short window to join, unless the batch is already full
+            if self._queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.max_wait)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            # Skip requests whose clients have already gone away
+            batch = [(image, future) for image, future in batch if not future.done()]
+            if not batch:
+                self._in_flight = []
+                continue
+
+            self._in_flight = batch
+            await self._verify_batch(batch)
+            self._in_flight = []
+
+    async def _verify_batch(self, batch: list[tuple[ImageLike, asyncio.Future]]) -> None:
+        """Verify a batch in the executor and resolve each request's future."""
+        loop = asyncio.get_running_loop()
+        images = [image for image, _ in batch]
+        try:
+            results = await loop.run_in_executor(self.executor, self.clip_service.verify_batch, images)
+        except Exception as e:
+            if len(batch) == 1:
+                results = [e]
+            else:
+                # One bad upload shouldn't fail everyone batched with it: retry one by one
+                results = []
+                for image in images:
+                    try:
+                        results.append(await loop.run_in_executor(
+                            self.executor, self.clip_service.verify_image, image
+                        ))
+                    except Exception as item_error:
+                        results.append(item_error)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
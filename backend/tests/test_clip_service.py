@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app import clip_service
+from app.clip_service import decode_image
+
+REFERENCE_ART = Path(__file__).parent.parent / "reference_art"
+
+SVG = (
+    b'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10">'
+    b'<rect width="10" height="10"/></svg>'
+)
+
+requires_vips = pytest.mark.skipif(not clip_service.PYVIPS_AVAILABLE, reason="libvips not installed")
+
+
+@requires_vips
+def test_vips_decodes_jpeg_with_shrink_on_load():
+    image = decode_image((REFERENCE_ART / "IMG_0530.jpeg").read_bytes(), shortest_edge=224)
+
+    assert image.dtype == np.uint8
+    assert min(image.shape[:2]) == 224
+    assert image.shape[2] == 3
+
+
+@requires_vips
+def test_vips_rejects_untrusted_formats():
+    with pytest.raises(Exception):
+        clip_service._decode_with_vips(SVG)
+
+    # Pillow can't read SVG either, so the upload is refused rather than rasterized
+    with pytest.raises(Exception):
+        decode_image(SVG)
+
+
+@pytest.fixture
+def preprocessing_service():
+    """CLIPService with only the preprocessing state, built from the default CLIP image processor."""
+    import torch
+    from transformers import CLIPImageProcessor
+
+    processor = CLIPImageProcessor()
+    service = clip_service.CLIPService.__new__(clip_service.CLIPService)
+    service.device = "cpu"
+    service.resize_size = processor.size["shortest_edge"]
+    service.crop_size = (processor.crop_size["height"], processor.crop_size["width"])
+    service.pixel_mean = torch.tensor(processor.image_mean).view(1, 3, 1, 1)
+    service.pixel_std = torch.tensor(processor.image_std).view(1, 3, 1, 1)
+    return service, processor
+
+
+@pytest.mark.parametrize("height, width", [(300, 451), (451, 300), (1000, 667), (224, 500), (640, 640)])
+def test_resize_shape_matches_clip_processor(preprocessing_service, height, width):
+    from transformers.image_transforms import get_resize_output_image_size
+
+    service, processor = preprocessing_service
+    expected = get_resize_output_image_size(
+        np.zeros((height, width, 3)), processor.size["shortest_edge"], default_to_square=False
+    )
+
+    assert service._resize_shape(height, width) == tuple(expected)
+
+
+def test_preprocess_shape_matches_clip_processor(preprocessing_service):
+    service, processor = preprocessing_service
+    image = np.random.default_rng(0).integers(0, 256, size=(300, 451, 3), dtype=np.uint8)
+
+    expected = processor(images=image, return_tensors="pt")["pixel_values"]
+
+    assert service._preprocess(image).shape == expected.shape
@@ -0,0 +1,75 @@
+import asyncio
+import gzip
+
+from app.compression import TextGZipMiddleware
+
+
+def make_app(content_type: bytes, chunks: list[bytes]):
+    async def app(scope, receive, send):
+        headers = [(b"content-type", content_type)]
+        if len(chunks) == 1:
+            headers.append((b"content-length", str(len(chunks[0])).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+def run(content_type: bytes, chunks: list[bytes], accept_encoding: bytes = b"gzip, br"):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    middleware = TextGZipMiddleware(make_app(content_type, chunks), minimum_size=1024, compresslevel=5)
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding)]}
+    asyncio.run(middleware(scope, None, send))
+
+    headers = dict(messages[0]["headers"])
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return headers, body
+
+
+def test_json_is_compressed():
+    payload = b'{"items": []}' * 200
+
+    headers, body = run(b"application/json", [payload])
+
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"content-length"] == str(len(body)).encode()
+    assert gzip.decompress(body) == payload
+
+
+def test_images_pass_through():
+    payload = b"\xff\xd8\xff" + b"x" * 5000
+
+    headers, body = run(b"image/jpeg", [payload])
+
+    assert b"content-encoding" not in headers
+    assert body == payload
+
+
+def test_small_responses_pass_through():
+    headers, body = run(b"application/json", [b'{"status": "healthy"}'])
+
+    assert b"content-encoding" not in headers
+    assert body == b'{"status": "healthy"}'
+
+
+def test_streamed_text_is_compressed():
+    chunks = [b"a" * 2000, b"b" * 2000, b"c" * 10]
+
+    headers, body = run(b"text/html; charset=utf-8", chunks)
+
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    assert gzip.decompress(body) == b"".join(chunks)
+
+
+def test_clients_without_gzip_get_identity():
+    payload = b'{"items": []}' * 200
+
+    headers, body = run(b"application/json", [payload], accept_encoding=b"identity")
+
+    assert b"content-encoding" not in headers
+    assert body == payload
@@ -0,0 +1,24 @@
+import io
+from pathlib import Path
+
+from PIL import Image
+
+from app.gallery_service import MAX_IMAGE_SIZE, _compress_image_bytes, _open_for_thumbnail
+
+PHONE_JPEG = Path(__file__).parent.parent / "reference_art" / "IMG_0530.jpeg"
+
+
+def test_draft_decodes_phone_jpeg_at_reduced_scale():
+    img = _open_for_thumbnail(PHONE_JPEG.read_bytes())
+
+    # 4032x3024 decodes at 1/2 scale: smaller than full size but still covers the box
+    assert img.size == (2016, 1512)
+    assert min(img.size) >= MAX_IMAGE_SIZE
+
+
+def test_compressed_image_fits_max_size():
+    compressed = _compress_image_bytes(PHONE_JPEG.read_bytes())
+
+    img = Image.open(io.BytesIO(compressed))
+    assert img.format == "JPEG"
+    assert max(img.size) == MAX_IMAGE_SIZE
@@ -0,0 +1,61 @@
+import asyncio
+
+from app.verification_batcher import VerificationBatcher
+
+BAD = "bad"
+
+
+class FakeCLIPService:
+    """Stands in for CLIPService: any batch containing BAD fails as a whole."""
+
+    def __init__(self):
+        self.batches = []
+
+    def verify_batch(self, images):
+        self.batches.append(list(images))
+        if BAD in images:
+            raise ValueError("cannot decode")
+        return [{"image": image} for image in images]
+
+    def verify_image(self, image):
+        return self.verify_batch([image])[0]
+
+
+def test_bad_image_only_fails_its_own_request():
+    async def scenario():
+        service = FakeCLIPService()
+        batcher = VerificationBatcher(service, max_batch=8, max_wait_ms=20)
+        batcher.start()
+        try:
+            return service, await asyncio.gather(
+                batcher.verify("a"), batcher.verify(BAD), batcher.verify("b"),
+                return_exceptions=True,
+            )
+        finally:
+            await batcher.stop()
+
+    service, results = asyncio.run(scenario())
+
+    assert service.batches[0] == ["a", BAD, "b"]
+    assert results[0] == {"image": "a"}
+    assert isinstance(results[1], ValueError)
+    assert results[2] == {"image": "b"}
+
+
+def test_stop_fails_in_flight_and_queued_requests():
+    class BlockingService(FakeCLIPService):
+        def verify_batch(self, images):
+            raise AssertionError("batch should not run")
+
+    async def scenario():
+        batcher = VerificationBatcher(BlockingService(), max_batch=8, max_wait_ms=10_000)
+        batcher.start()
+        requests = [asyncio.create_task(batcher.verify(image)) for image in ("a", "b")]
+        # Let the worker pick up the first request and start its wait window
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        return await asyncio.wait_for(asyncio.gather(*requests, return_exceptions=True), timeout=1)
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -31,24 +31,26 @@ function App() {
   // Gallery state (public)
   const [galleryItems, setGalleryItems] = useState([]);
   const [galleryLoading, setGalleryLoading] = useState(true);
-  const [galleryPage, setGalleryPage] = useState(1);
+  const [galleryCursor, setGalleryCursor] = useState(null);
   const [hasMore, setHasMore] = useState(false);
 
   // Gallery state (user-specific)
   const [userGalleryItems, setUserGalleryItems] = useState([]);
   const [userGalleryLoading, setUserGalleryLoading] = useState(true);
-  const [userGalleryPage, setUserGalleryPage] = useState(1);
+  const [userGalleryCursor, setUserGalleryCursor] = useState(null);
   const [userHasMore, setUserHasMore] = useState(false);
   
   // Auth modal state
   const [showAuthModal, setShowAuthModal] = useState(false);
   const [authModalMode, setAuthModalMode] = useState('login');
 
-  const buildGalleryUrl = (page, userId) => {
+  const buildGalleryUrl = (cursor, userId) => {
     const params = new URLSearchParams({
-      page: page.toString(),
       per_page: '20',
     });
+    if (cursor) {
+      params.set('cursor', cursor);
+    }
     if (userId) {
       params.set('user_id', userId.toString());
     }
@@ -56,10 +58,10 @@ function App() {
   };
 
   // Fetch public gallery from API
-  const fetchGallery = useCallback(async (page = 1, append = false) => {
+  const fetchGallery = useCallback(async (cursor = null, append = false) => {
     try {
       setGalleryLoading(true);
-      const response = await fetch(buildGalleryUrl(page), {
+      const response = await fetch(buildGalleryUrl(cursor), {
         headers: {
           'ngrok-skip-browser-warning': 'true',
         },
@@ -74,7 +76,7 @@ function App() {
       // Transform API response to match existing gallery item format
       const items = data.items.map(item => ({
         id: item.id.toString(),
-        image: item.image_data,
+        image: `${API_URL}${item.image_url}`,
         isVerified: item.is_verified,
         confidence: item.confidence,
         message: item.message,
@@ -91,7 +93,7 @@ function App() {
       }
       
       setHasMore(data.has_more);
-      setGalleryPage(page);
+      setGalleryCursor(data.next_cursor);
     } catch (err) {
       console.error('Failed to fetch gallery:', err);
     } finally {
@@ -100,18 +102,18 @@ function App() {
   }, []);
 
   // Fetch user-specific gallery from API
-  const fetchUserGallery = useCallback(async (page = 1, append = false, userId = null) => {
+  const fetchUserGallery = useCallback(async (cursor = null, append = false, userId = null) => {
     if (!userId) {
       setUserGalleryItems([]);
       setUserHasMore(false);
-      setUserGalleryPage(1);
+      setUserGalleryCursor(null);
       setUserGalleryLoading(false);
       return;
     }
 
     try {
       setUserGalleryLoading(true);
-      const response = await fetch(buildGalleryUrl(page, userId), {
+      const response = await fetch(buildGalleryUrl(cursor, userId), {
         headers: {
           'ngrok-skip-browser-warning': 'true',
         },
@@ -125,7 +127,7 @@ function App() {
 
       const items = data.items.map(item => ({
         id: item.id.toString(),
-        image: item.image_data,
+        image: `${API_URL}${item.image_url}`,
         isVerified: item.is_verified,
         confidence: item.confidence,
         message: item.message,
@@ -142,7 +144,7 @@ function App() {
       }
 
       setUserHasMore(data.has_more);
-      setUserGalleryPage(page);
+      setUserGalleryCursor(data.next_cursor);
     } catch (err) {
       console.error('Failed to fetch user gallery:', err);
     } finally {
@@ -158,7 +160,7 @@ function App() {
   // Load user gallery when needed
   useEffect(() => {
     if (activePage === 'my-gallery' && user?.uid) {
-      fetchUserGallery(1, false, user.uid);
+      fetchUserGallery(null, false, user.uid);
     }
   }, [activePage, user?.uid, fetchUserGallery]);
 
@@ -180,15 +182,15 @@ function App() {
 
   const loadMoreGallery = useCallback(() => {
     if (!galleryLoading && hasMore) {
-      fetchGallery(galleryPage + 1, true);
+      fetchGallery(galleryCursor, true);
     }
-  }, [fetchGallery, galleryLoading, hasMore, galleryPage]);
+  }, [fetchGallery, galleryLoading, hasMore, galleryCursor]);
 
   const loadMoreUserGallery = useCallback(() => {
     if (!userGalleryLoading && userHasMore && user?.uid) {
-      fetchUserGallery(userGalleryPage + 1, true, user.uid);
+      fetchUserGallery(userGalleryCursor, true, user.uid);
     }
-  }, [fetchUserGallery, userGalleryLoading, userHasMore, userGalleryPage, user?.uid]);
+  }, [fetchUserGallery, userGalleryLoading, userHasMore, userGalleryCursor, user?.uid]);
 
   const verifyImage = useCallback(async (imageData) => {
     setImagePreview(imageData.preview);
@@ -273,7 +275,7 @@ function App() {
       // Refresh user stats and galleries
       await refreshUser();
       await fetchGallery();
-      await fetchUserGallery(1, false, user?.uid);
+      await fetchUserGallery(null, false, user?.uid);
 
       setPendingAutoSave(false);
       handleReset();